@@ -1,17 +1,30 @@
 from __future__ import annotations
 
 import argparse
+from bisect import bisect_left
+from collections import deque
 import csv
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from operator import attrgetter
 from pathlib import Path
-from typing import Dict, Iterable, List, Literal, Optional
+from typing import Deque, Dict, Iterable, List, Literal, NamedTuple, Optional, Set, Tuple
 import heapq
+import marshal
+import sys
+from sys import intern
 
 MIN_LAYOVER_MINUTES = 60
+CACHE_SUFFIX = ".fpcache"
+CACHE_VERSION = 2
+# Cheapest-search heap keys pack (cost, arrival) into one int; minutes in a
+# day fit well inside the low TIME_BITS bits.
+TIME_BITS = 16
+TIME_MASK = (1 << TIME_BITS) - 1
 Cabin = Literal["economy", "business", "first"]
+CABIN_IDX: Dict[Cabin, int] = {"economy": 0, "business": 1, "first": 2}
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Flight:
     origin: str
     dest: str
@@ -23,18 +36,14 @@ class Flight:
     first: int
 
     def price_for(self, cabin: Cabin) -> int:
-        if cabin == "economy":
-            return self.economy
-        if cabin == "business":
-            return self.business
-        if cabin == "first":
-            return self.first
-        raise ValueError
+        return PRICE_GETTERS[cabin_index(cabin)](self)
 
 
 @dataclass
 class Itinerary:
     flights: List[Flight]
+    # Totals already known to the search that built this itinerary.
+    price_cache: Dict[Cabin, int] = field(default_factory=dict, repr=False, compare=False)
 
     def is_empty(self) -> bool:
         return not self.flights
@@ -64,19 +73,43 @@ class Itinerary:
         return self.flights[-1].arrive
 
     def total_price(self, cabin: Cabin) -> int:
-        return sum(f.price_for(cabin) for f in self.flights)
+        cached = self.price_cache.get(cabin)
+        if cached is not None:
+            return cached
+        return sum(map(PRICE_GETTERS[cabin_index(cabin)], self.flights))
 
     def num_stops(self) -> int:
         return max(0, len(self.flights) - 1)
 
 
+# Outgoing flights per airport, sorted by departure time (see build_graph).
 Graph = Dict[str, List[Flight]]
+by_depart = attrgetter("depart")
+# Per-cabin price readers, indexed by CABIN_IDX.
+PRICE_GETTERS = (attrgetter("economy"), attrgetter("business"), attrgetter("first"))
+
+
+def cabin_index(cabin: Cabin) -> int:
+    idx = CABIN_IDX.get(cabin)
+    if idx is None:
+        raise ValueError
+    return idx
+
+
+# Every canonical "HH:MM" string maps straight to its minute count, so the
+# common case is one dict lookup instead of a split and two int() calls.
+HHMM_MINUTES: Dict[str, int] = {
+    f"{h:02d}:{m:02d}": h * 60 + m for h in range(24) for m in range(60)
+}
 
 
 def parse_time(hhmm: str) -> int:
-    h, m = hhmm.split(":")
-    h = int(h)
-    m = int(m)
+    minutes = HHMM_MINUTES.get(hhmm)
+    if minutes is not None:
+        return minutes
+    hh, mm = hhmm.split(":")
+    h = int(hh)
+    m = int(mm)
     if not (0 <= h < 24 and 0 <= m < 60):
         raise ValueError
     return h * 60 + m
@@ -100,45 +133,52 @@ def parse_flight_line_txt(line: str) -> Optional[Flight]:
     arrive = parse_time(ar)
     if arrive <= depart:
         raise ValueError
-    return Flight(origin, dest, num, depart, arrive, int(e), int(b), int(f))
+    return Flight(intern(origin), intern(dest), num, depart, arrive, int(e), int(b), int(f))
 
 
 def load_flights_txt(path: str) -> List[Flight]:
     flights = []
-    with open(path) as file:
-        for i, line in enumerate(file, 1):
-            try:
-                f = parse_flight_line_txt(line)
-                if f:
-                    flights.append(f)
-            except Exception as e:
-                raise ValueError(f"{path}:{i}: {e}")
+    # Split on newlines only, as iterating the file did; splitlines() would
+    # also break on form feeds and other separators that str.split() treats
+    # as whitespace within a line.
+    lines = Path(path).read_text().split("\n")
+    for i, line in enumerate(lines, 1):
+        try:
+            f = parse_flight_line_txt(line)
+            if f:
+                flights.append(f)
+        except Exception as e:
+            raise ValueError(f"{path}:{i}: {e}")
     return flights
 
 
 def load_flights_csv(path: str) -> List[Flight]:
     flights = []
-    with open(path) as file:
-        reader = csv.DictReader(file)
+    with open(path, newline="") as file:
+        reader = csv.reader(file)
+        header = next(reader, [])
         req = ["origin", "dest", "flight_number", "depart", "arrive", "economy", "business", "first"]
         for r in req:
-            if r not in reader.fieldnames:
+            if r not in header:
                 raise ValueError
+        i_origin, i_dest, i_num, i_dep, i_arr, i_econ, i_biz, i_first = [header.index(r) for r in req]
         for row in reader:
-            dep = parse_time(row["depart"])
-            arr = parse_time(row["arrive"])
+            if not row:
+                continue
+            dep = parse_time(row[i_dep])
+            arr = parse_time(row[i_arr])
             if arr <= dep:
                 raise ValueError
             flights.append(
                 Flight(
-                    row["origin"],
-                    row["dest"],
-                    row["flight_number"],
+                    intern(row[i_origin]),
+                    intern(row[i_dest]),
+                    row[i_num],
                     dep,
                     arr,
-                    int(row["economy"]),
-                    int(row["business"]),
-                    int(row["first"]),
+                    int(row[i_econ]),
+                    int(row[i_biz]),
+                    int(row[i_first]),
                 )
             )
     return flights
@@ -154,71 +194,148 @@ def build_graph(flights: Iterable[Flight]) -> Graph:
     graph: Graph = {}
     for f in flights:
         graph.setdefault(f.origin, []).append(f)
+    for outgoing in graph.values():
+        outgoing.sort(key=by_depart)
+    return graph
+
+
+def load_graph_cached(path: str) -> Graph:
+    # Opt-in (compare --cache): the built graph is stored with marshal as
+    # plain tuples next to the schedule file and reused while the file's size
+    # and mtime match, skipping both parsing and build_graph.
+    src = Path(path)
+    stat = src.stat()
+    key = (CACHE_VERSION, stat.st_size, stat.st_mtime_ns)
+    cache = src.with_name(src.name + CACHE_SUFFIX)
+    try:
+        cached_key, rows = marshal.loads(cache.read_bytes())
+        if cached_key == key:
+            return {origin: [Flight(*row) for row in block] for origin, block in rows.items()}
+    except (OSError, EOFError, ValueError, TypeError, AttributeError):
+        pass
+    graph = build_graph(load_flights(path))
+    rows = {
+        origin: [
+            (f.origin, f.dest, f.flight_number, f.depart, f.arrive, f.economy, f.business, f.first)
+            for f in block
+        ]
+        for origin, block in graph.items()
+    }
+    try:
+        cache.write_bytes(marshal.dumps((key, rows)))
+    except OSError:
+        pass
     return graph
 
 
 def reconstruct_itinerary(prev: Dict[str, Flight], dest: str) -> Itinerary:
-    path = []
+    path: Deque[Flight] = deque()
     cur = dest
     while cur in prev:
         fl = prev[cur]
-        path.append(fl)
+        path.appendleft(fl)
         cur = fl.origin
-    path.reverse()
-    return Itinerary(path)
+    return Itinerary(list(path))
 
 
 def find_earliest_itinerary(graph: Graph, start: str, dest: str, earliest_departure: int) -> Optional[Itinerary]:
-    dist = {}
+    # graph must come from build_graph: each airport's flights are bisected
+    # by departure time, so unsorted lists give wrong answers.
+    # Arrival times are small integer minutes, so a bucket queue (Dial's
+    # algorithm) replaces the heap: scan minute by minute from the departure.
+    dist: Dict[str, int] = {}
     prev: Dict[str, Flight] = {}
-    pq = [(earliest_departure, start)]
+    buckets: Dict[int, List[str]] = {earliest_departure: [start]}
     dist[start] = earliest_departure
-    visited = set()
-
-    while pq:
-        cur_time, airport = heapq.heappop(pq)
-        if airport in visited:
-            continue
-        visited.add(airport)
-        if airport == dest:
-            return reconstruct_itinerary(prev, dest)
-        for f in graph.get(airport, []):
-            required = cur_time if airport == start else cur_time + MIN_LAYOVER_MINUTES
-            if f.depart >= required:
-                if f.dest not in dist or f.arrive < dist[f.dest]:
-                    dist[f.dest] = f.arrive
-                    prev[f.dest] = f
-                    heapq.heappush(pq, (f.arrive, f.dest))
+    visited: Set[str] = set()
+    adjacency = graph.get
+    horizon = earliest_departure
+    t = earliest_departure
+
+    while t <= horizon:
+        for airport in buckets.pop(t, ()):
+            if airport in visited:
+                continue
+            visited.add(airport)
+            if airport == dest:
+                return reconstruct_itinerary(prev, dest)
+            required = t if airport == start else t + MIN_LAYOVER_MINUTES
+            outgoing = adjacency(airport, ())
+            for f in outgoing[bisect_left(outgoing, required, key=by_depart):]:
+                nxt = f.dest
+                arrive = f.arrive
+                if nxt not in dist or arrive < dist[nxt]:
+                    dist[nxt] = arrive
+                    prev[nxt] = f
+                    buckets.setdefault(arrive, []).append(nxt)
+                    if arrive > horizon:
+                        horizon = arrive
+        t += 1
     return None
 
 
 def find_cheapest_itinerary(graph: Graph, start: str, dest: str, earliest_departure: int, cabin: Cabin) -> Optional[Itinerary]:
-    dist = {}
-    prev: Dict[str, Flight] = {}
-    pq = [(0, earliest_departure, start)]
-    dist[start] = 0
-    visited = set()
+    # graph must come from build_graph: each airport's flights are bisected
+    # by departure time, so unsorted lists give wrong answers.
+    # Search over (airport, arrival) labels rather than airports: a cheap but
+    # late arrival must not hide a pricier one that still makes a connection.
+    # Labels pop in (cost, arrival) order, so one is dominated once its
+    # airport has been settled with an arrival no later than its own.
+    # Label -1 is the start; label i >= 0 arrived via flights[i] from
+    # parents[i].
+    price = PRICE_GETTERS[cabin_index(cabin)]
+    settled: Dict[str, int] = {}
+    flights: List[Flight] = []
+    parents: List[int] = []
+    pq: List[Tuple[int, int]] = [(earliest_departure, -1)]
+    heappush = heapq.heappush
+    heappop = heapq.heappop
+    adjacency = graph.get
 
     while pq:
-        cost, arr_time, airport = heapq.heappop(pq)
-        if (airport, cost) in visited:
+        key, label = heappop(pq)
+        cost = key >> TIME_BITS
+        arr_time = key & TIME_MASK
+        airport = flights[label].dest if label >= 0 else start
+        if airport in settled and settled[airport] <= arr_time:
             continue
-        visited.add((airport, cost))
+        settled[airport] = arr_time
         if airport == dest:
-            return reconstruct_itinerary(prev, dest)
-        for f in graph.get(airport, []):
-            earliest_allowed = arr_time if airport == start else arr_time + MIN_LAYOVER_MINUTES
-            if f.depart >= earliest_allowed:
-                new_cost = cost + f.price_for(cabin)
-                if f.dest not in dist or new_cost < dist[f.dest]:
-                    dist[f.dest] = new_cost
-                    prev[f.dest] = f
-                    heapq.heappush(pq, (new_cost, f.arrive, f.dest))
+            path: Deque[Flight] = deque()
+            while label >= 0:
+                path.appendleft(flights[label])
+                label = parents[label]
+            itin = Itinerary(list(path))
+            itin.price_cache[cabin] = cost
+            return itin
+        earliest_allowed = arr_time if label < 0 else arr_time + MIN_LAYOVER_MINUTES
+        outgoing = adjacency(airport, ())
+        for f in outgoing[bisect_left(outgoing, earliest_allowed, key=by_depart):]:
+            nxt = f.dest
+            if nxt in settled and settled[nxt] <= f.arrive:
+                continue
+            flights.append(f)
+            parents.append(label)
+            heappush(pq, (((cost + price(f)) << TIME_BITS) | f.arrive, len(flights) - 1))
     return None
 
 
-@dataclass
-class ComparisonRow:
+def find_all_itineraries(
+    graph: Graph, start: str, dest: str, earliest_departure: int
+) -> Tuple[Optional[Itinerary], Dict[Cabin, Optional[Itinerary]]]:
+    # The earliest-arrival search is exact about reachability, so when it
+    # finds no route none of the per-cabin searches can either.
+    earliest = find_earliest_itinerary(graph, start, dest, earliest_departure)
+    cheapest: Dict[Cabin, Optional[Itinerary]] = {}
+    for cabin in CABIN_IDX:
+        if earliest is None:
+            cheapest[cabin] = None
+        else:
+            cheapest[cabin] = find_cheapest_itinerary(graph, start, dest, earliest_departure, cabin)
+    return earliest, cheapest
+
+
+class ComparisonRow(NamedTuple):
     mode: str
     cabin: Optional[Cabin]
     itinerary: Optional[Itinerary]
@@ -239,15 +356,17 @@ def format_comparison_table(
     lines.append("-" * len(header))
 
     for r in rows:
-        if r.itinerary is None:
+        dep_time = r.itinerary.depart_time if r.itinerary is not None else None
+        arr_time = r.itinerary.arrive_time if r.itinerary is not None else None
+        if r.itinerary is None or dep_time is None or arr_time is None:
             lines.append(
                 f"{r.mode} | {r.cabin or 'N/A'} | N/A | N/A | N/A | N/A | N/A | {r.note}"
             )
             continue
 
-        dep = format_time(r.itinerary.depart_time)
-        arr = format_time(r.itinerary.arrive_time)
-        dur = r.itinerary.arrive_time - r.itinerary.depart_time
+        dep = format_time(dep_time)
+        arr = format_time(arr_time)
+        dur = arr_time - dep_time
         dh = dur // 60
         dm = dur % 60
         duration = f"{dh}h{dm:02d}m"
@@ -263,13 +382,15 @@ def format_comparison_table(
 
 def run_compare(args: argparse.Namespace) -> None:
     earliest = parse_time(args.departure_time)
-    flights = load_flights(args.flight_file)
-    graph = build_graph(flights)
+    if args.cache:
+        graph = load_graph_cached(args.flight_file)
+    else:
+        graph = build_graph(load_flights(args.flight_file))
 
-    it1 = find_earliest_itinerary(graph, args.origin, args.dest, earliest)
-    it2 = find_cheapest_itinerary(graph, args.origin, args.dest, earliest, "economy")
-    it3 = find_cheapest_itinerary(graph, args.origin, args.dest, earliest, "business")
-    it4 = find_cheapest_itinerary(graph, args.origin, args.dest, earliest, "first")
+    it1, cheapest = find_all_itineraries(graph, args.origin, args.dest, earliest)
+    it2 = cheapest["economy"]
+    it3 = cheapest["business"]
+    it4 = cheapest["first"]
 
     rows = [
         ComparisonRow("Earliest arrival", None, it1, "" if it1 else "(no valid itinerary)"),
@@ -278,7 +399,7 @@ def run_compare(args: argparse.Namespace) -> None:
         ComparisonRow("Cheapest | first", "first", it4, "" if it4 else "(no valid itinerary)"),
     ]
 
-    print(format_comparison_table(args.origin, args.dest, earliest, rows))
+    sys.stdout.write(format_comparison_table(args.origin, args.dest, earliest, rows) + "\n")
 
 
 def build_arg_parser() -> argparse.ArgumentParser:
@@ -290,6 +411,11 @@ def build_arg_parser() -> argparse.ArgumentParser:
     compare_parser.add_argument("origin")
     compare_parser.add_argument("dest")
     compare_parser.add_argument("departure_time")
+    compare_parser.add_argument(
+        "--cache",
+        action="store_true",
+        help=f"reuse the parsed graph from FLIGHT_FILE{CACHE_SUFFIX}, creating it if needed",
+    )
     compare_parser.set_defaults(func=run_compare)
 
     return parser
@@ -10,6 +10,7 @@ from flight_planner import (
     build_graph,
     find_earliest_itinerary,
     find_cheapest_itinerary,
+    find_all_itineraries,
     MIN_LAYOVER_MINUTES,
     parse_time,
 )
@@ -65,6 +66,17 @@ def test_build_graph_basic():
     assert {fl.dest for fl in graph["B"]} == {"C"}
 
 
+def test_build_graph_sorts_outgoing_by_departure():
+    flights = [
+        f("A", "B", "F1", "12:00", "13:00", 100, 200, 300),
+        f("A", "C", "F2", "07:00", "08:00", 100, 200, 300),
+        f("A", "B", "F3", "09:30", "10:30", 100, 200, 300),
+    ]
+    graph = build_graph(flights)
+
+    assert [fl.flight_number for fl in graph["A"]] == ["F2", "F3", "F1"]
+
+
 def test_earliest_itinerary_direct_vs_connecting():
     # Direct is earlier arrival than connect.
     flights = [
@@ -191,6 +203,9 @@ def test_cheapest_itinerary_prefers_cheaper_path_in_economy():
     direct_price = flights[0].price_for("economy")
     path_price = itin.total_price("economy")
     assert path_price < direct_price
+    # The search's cached total matches the per-flight sum.
+    assert itin.price_cache["economy"] == path_price
+    assert path_price == sum(fl.economy for fl in itin.flights)
     assert_valid_itinerary_times(itin)
 
 
@@ -251,3 +266,48 @@ def test_extremely_long_trip_multiple_legs():
     assert itin.origin == "A"
     assert itin.dest == "E"
     assert_valid_itinerary_times(itin)
+
+
+def test_find_all_itineraries_matches_individual_searches():
+    flights = [
+        f("A", "B", "Fdirect", "08:00", "10:00", 400, 500, 900),
+        f("A", "X", "Fax", "08:00", "09:00", 150, 400, 800),
+        f("X", "B", "Fxb", "10:30", "11:30", 150, 400, 800),
+    ]
+    graph = build_graph(flights)
+    t0 = parse_time("07:00")
+
+    earliest, cheapest = find_all_itineraries(graph, "A", "B", t0)
+    assert earliest.flights == find_earliest_itinerary(graph, "A", "B", t0).flights
+    assert set(cheapest) == {"economy", "business", "first"}
+    for cabin, itin in cheapest.items():
+        expected = find_cheapest_itinerary(graph, "A", "B", t0, cabin)
+        assert itin.total_price(cabin) == expected.total_price(cabin)
+
+    none_earliest, none_cheapest = find_all_itineraries(graph, "B", "A", t0)
+    assert none_earliest is None
+    assert all(itin is None for itin in none_cheapest.values())
+
+
+def test_cheapest_itinerary_never_breaks_layover():
+    # The cheap A->X lands too late for X->B. The result must not pair it
+    # with X->B, nor let it hide the pricier, earlier A->X that connects.
+    flights = [
+        f("A", "X", "Fearly", "07:30", "09:00", 200, 400, 800),
+        f("A", "X", "Flate", "08:00", "12:00", 100, 300, 700),
+        f("X", "B", "Fxb", "10:30", "11:30", 150, 400, 800),
+    ]
+    graph = build_graph(flights)
+    t0 = parse_time("07:00")
+    itin = find_cheapest_itinerary(graph, "A", "B", t0, cabin="economy")
+    assert isinstance(itin, Itinerary)
+    assert [fl.flight_number for fl in itin.flights] == ["Fearly", "Fxb"]
+    assert itin.total_price("economy") == 350
+    assert_valid_itinerary_times(itin)
+
+    # Whenever an earliest route exists, every cabin finds one too.
+    earliest, cheapest = find_all_itineraries(graph, "A", "B", t0)
+    assert isinstance(earliest, Itinerary)
+    for cabin, cabin_itin in cheapest.items():
+        assert isinstance(cabin_itin, Itinerary), cabin
+        assert_valid_itinerary_times(cabin_itin)
@@ -67,6 +67,18 @@ def test_itinerary_properties_and_price_and_stops():
     assert first_total == 1500 + 2000
 
 
+def test_price_for_selects_cabin_and_rejects_unknown():
+    itin = make_demo_itinerary()
+    f1 = itin.flights[0]
+    assert f1.price_for("economy") == 300
+    assert f1.price_for("business") == 800
+    assert f1.price_for("first") == 1500
+    with pytest.raises(ValueError):
+        f1.price_for("premium")
+    with pytest.raises(ValueError):
+        itin.total_price("premium")
+
+
 def test_format_comparison_table_basic():
     itin = make_demo_itinerary()
     rows = [
@@ -140,6 +152,8 @@ def test_end_to_end_small_cli(tmp_path: Path, capsys):
     main(argv)
 
     captured = capsys.readouterr().out
+    # Caching is opt-in, so a plain run writes nothing next to the schedule.
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["tiny_flights.txt"]
 
     # We don't over-constrain formatting, but we expect at least:
     assert "ICN" in captured
@@ -7,6 +7,7 @@ import textwrap
 
 import pytest
 
+import flight_planner
 from flight_planner import (
     Flight,
     parse_time,
@@ -15,6 +16,9 @@ from flight_planner import (
     load_flights_txt,
     load_flights_csv,
     load_flights,
+    build_graph,
+    load_graph_cached,
+    CACHE_SUFFIX,
 )
 
 
@@ -27,6 +31,11 @@ def test_parse_time_roundtrip():
         assert back == m
 
 
+def test_parse_time_accepts_unpadded_hour():
+    assert parse_time("8:05") == 8 * 60 + 5
+    assert parse_time("08:05") == 8 * 60 + 5
+
+
 @pytest.mark.parametrize(
     "bad",
     [
@@ -89,6 +98,23 @@ def test_load_flights_txt_basic(tmp_path: Path):
     assert ("NRT", "ICN") in codes
 
 
+def test_load_flights_txt_keeps_form_feed_within_line(tmp_path: Path):
+    path = tmp_path / "flights.txt"
+    path.write_text(
+        "ICN NRT FW101 08:00\f10:00 300 800 1500\n"
+        "NRT ICN FW102 13:00 11:00 320 820 1520\n",
+        encoding="utf-8",
+    )
+
+    with pytest.raises(ValueError, match=r":2:"):
+        load_flights_txt(str(path))
+
+    path.write_text("ICN NRT FW101 08:00\f10:00 300 800 1500\n", encoding="utf-8")
+    flights = load_flights_txt(str(path))
+    assert len(flights) == 1
+    assert flights[0].arrive == parse_time("10:00")
+
+
 def test_load_flights_csv_basic(tmp_path: Path):
     content = textwrap.dedent(
         """
@@ -129,3 +155,45 @@ def test_load_flights_dispatch_uses_extension(tmp_path: Path):
     assert len(flights_csv) == 1
     assert flights_txt[0].origin == "ICN"
     assert flights_csv[0].origin == "NRT"
+
+
+def test_load_graph_cached_reuses_and_invalidates(tmp_path: Path, monkeypatch):
+    txt = tmp_path / "flights.txt"
+    txt.write_text(
+        "ICN NRT FW101 08:00 10:00 300 800 1500\n", encoding="utf-8"
+    )
+
+    first = load_graph_cached(str(txt))
+    cache = tmp_path / ("flights.txt" + CACHE_SUFFIX)
+    assert cache.exists()
+    assert first == build_graph(load_flights(str(txt)))
+
+    # Second load must come from the cache, not the parser.
+    def fail(path: str):
+        raise AssertionError("schedule was re-parsed")
+
+    with monkeypatch.context() as m:
+        m.setattr(flight_planner, "load_flights", fail)
+        again = load_graph_cached(str(txt))
+    assert again == first
+
+    # Changing the schedule invalidates the cache.
+    txt.write_text(
+        "ICN NRT FW101 08:00 10:00 300 800 1500\n"
+        "NRT ICN FW102 11:00 13:00 320 820 1520\n",
+        encoding="utf-8",
+    )
+    updated = load_graph_cached(str(txt))
+    assert set(updated) == {"ICN", "NRT"}
+
+
+def test_load_graph_cached_ignores_corrupt_cache(tmp_path: Path):
+    txt = tmp_path / "flights.txt"
+    txt.write_text(
+        "ICN NRT FW101 08:00 10:00 300 800 1500\n", encoding="utf-8"
+    )
+    cache = tmp_path / ("flights.txt" + CACHE_SUFFIX)
+    cache.write_bytes(b"not marshal data")
+
+    graph = load_graph_cached(str(txt))
+    assert graph == build_graph(load_flights(str(txt)))